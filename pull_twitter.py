@@ -48,6 +48,9 @@ if __name__ == "__main__":
     parser_timeline.add_argument("-tpq", "--tweets-per-query", type=int, 
         help="Number of tweets present in each response from the Twitter API",
         default=100)
+    parser_timeline.add_argument("-w", "--max-workers", type=int,
+        help="Number of timelines to pull concurrently",
+        default=8)
     parser_timeline.set_defaults(name="timeline")
 
 
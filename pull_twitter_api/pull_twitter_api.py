@@ -1,12 +1,13 @@
 import os
 import pprint
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
 import pandas as pd
 from datetime import datetime
 import json
 import yaml
 
-from tweepy.client import Client
-
+from .utils.client import PullTwitterClient
 from .utils.config_schema import PullTwitterConfig
 from .utils.timeline import Timeline
 from .utils.pull_timelines import pull_timelines
@@ -25,7 +26,7 @@ class PullTwitterAPI():
 	def __init__(self, 
 		config: PullTwitterConfig = None,
 		config_path: str = None,
-		save_format: str = 'csv',
+		save_format: str = None,
 		full_save: bool = True):
 		"""
 		Constructor for PullTwitterAPI
@@ -36,7 +37,8 @@ class PullTwitterAPI():
 			-config_path: str
 				-Path to a yaml config file. Should not be set if config parameter is passed
 			-save_format: str
-				-Format to save query results in. One of ['csv', 'json']
+				-Format to save query results in. One of ['parquet', 'feather', 'csv', 'json']. Defaults to the
+				 save_format of the config
 		"""
 
 		# Configuration initialization
@@ -53,8 +55,8 @@ class PullTwitterAPI():
 
 
 		# Client initialization
-		self.client = Client(self.bearer_token, wait_on_rate_limit = True)
-		self.save_format = save_format
+		self.client = PullTwitterClient(self.bearer_token, wait_on_rate_limit = True)
+		self.save_format = save_format if save_format else self.config.local.save_format
 
 	# Configuration and directory setup
 	
@@ -127,6 +129,7 @@ class PullTwitterAPI():
 		c_kwargs = dict({'user_csv': user_csv}, **kwargs)
 		timeline_response = TimelineResponse(
 			auto_save = auto_save,
+			save_format = self.save_format,
 			output_dir = self.output_dir,
 			config = self.config,
 			command_dict = c_kwargs
@@ -157,6 +160,7 @@ class PullTwitterAPI():
 		c_kwargs = dict({'user_csv': user_csv}, **kwargs)
 		user_response = UserResponse(
 			auto_save = auto_save,
+			save_format = self.save_format,
 			output_dir = self.output_dir,
 			config = self.config,
 			command_dict = c_kwargs
@@ -207,6 +211,27 @@ class PullTwitterAPI():
 
 		return search_response
 
+	def search_many(self, queries: List[str], auto_save = False, max_workers: int = 4, **kwargs) -> list:
+		"""
+		Pull tweets for several queries concurrently, each into its own SearchResponse
+
+		Parameters:
+			-queries: List[str]
+				-The search queries to filter tweets
+			-max_workers: int
+				-Number of queries to pull at once. The full archive search allows 1 request/sec per app, so
+				 each query waits min_request_interval times the number of queries pulled at once between its
+				 requests to stay under it
+		"""
+
+		min_request_interval = kwargs.pop('min_request_interval', 1.0) * max(1, min(max_workers, len(queries)))
+
+		def search_one(query):
+			return self.search(query, auto_save = auto_save, min_request_interval = min_request_interval, **kwargs)
+
+		with ThreadPoolExecutor(max_workers = max_workers) as executor:
+			return list(executor.map(search_one, queries))
+
 	def lookup(self, id_csv: str, auto_save = False, **kwargs) -> None:
 		"""
 		Pull tweets satisyfing the given query
@@ -0,0 +1,30 @@
+"""
+tweepy client used by PullTwitterAPI
+"""
+import orjson
+from requests.adapters import HTTPAdapter
+from tweepy.client import Client
+from urllib3.util.retry import Retry
+
+
+class PullTwitterClient(Client):
+    """
+    tweepy Client decoding the api response bodies with orjson instead of the stdlib json module
+    """
+
+    def __init__(self, *args, pool_maxsize: int = 32, **kwargs):
+        super(PullTwitterClient, self).__init__(*args, **kwargs)
+
+        # Keep enough pooled keep-alive connections for concurrent pulls. Only connection errors are retried at the
+        # transport, error responses are raised by tweepy and retried (with backoff) by retry.call_with_retries
+        retries = Retry(total=3, backoff_factor=0.1, respect_retry_after_header=False)
+        self.session.mount('https://', HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize,
+                                                   max_retries=retries))
+
+    def request(self, *args, **kwargs):
+        response = super(PullTwitterClient, self).request(*args, **kwargs)
+
+        # tweepy decodes the body through response.json()
+        content = response.content
+        response.json = lambda **kwargs: orjson.loads(content)
+        return response
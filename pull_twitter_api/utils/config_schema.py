@@ -1,10 +1,15 @@
+import hashlib
 import os
+import orjson
 import yaml
 
 from pydantic import BaseModel, SecretStr, FilePath, DirectoryPath
 
 from .twitter_schema import LookupQueryParams
 
+CONFIG_CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+                                'twitter_pull')
+
 
 # twitter
 class TwitterAccount(BaseModel):
@@ -27,10 +32,9 @@ class PullTwitterConfig(BaseModel):
     twitter: TwitterConfig
 
     @classmethod
-    def from_file(cls, path_to_config):
+    def from_file(cls, path_to_config, use_cache: bool = True):
 
-        with open(path_to_config, 'r') as f:
-            config_yml = yaml.load(f, Loader=yaml.FullLoader)
+        config_yml = read_config_file(path_to_config) if use_cache else _parse_config_file(path_to_config)
 
         config = cls(**config_yml)
         config.set_environment_vars()
@@ -44,3 +48,41 @@ class PullTwitterConfig(BaseModel):
     class Config:
         extra = "forbid"
         use_enum_values = False
+
+
+def read_config_file(path_to_config) -> dict:
+    """
+    Parse a yaml config file. The parsed contents are cached as json under CONFIG_CACHE_DIR in one file per config
+    path, along with the modification time and size of the config, so loading an unchanged config skips the yaml
+    parse. Editing the config overwrites its cache file.
+    """
+    stat = os.stat(path_to_config)
+    key = hashlib.blake2b(os.path.abspath(path_to_config).encode(), digest_size=16).hexdigest()
+    cache_path = os.path.join(CONFIG_CACHE_DIR, f"config_{key}.json")
+
+    try:
+        with open(cache_path, 'rb') as f:
+            cached = orjson.loads(f.read())
+        if cached['mtime_ns'] == stat.st_mtime_ns and cached['size'] == stat.st_size:
+            return cached['config']
+    except (OSError, orjson.JSONDecodeError, KeyError, TypeError):
+        pass
+
+    config_yml = _parse_config_file(path_to_config)
+
+    # the config holds the bearer token, so the cache is only readable by its owner
+    try:
+        os.makedirs(CONFIG_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with os.fdopen(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb') as f:
+            f.write(orjson.dumps({'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'config': config_yml}))
+        os.replace(tmp_path, cache_path)
+    except (OSError, orjson.JSONEncodeError) as e:
+        print(f"Could not cache config {path_to_config}. Error: ", e)
+
+    return config_yml
+
+
+def _parse_config_file(path_to_config) -> dict:
+    with open(path_to_config, 'r') as f:
+        return yaml.load(f, Loader=yaml.FullLoader)
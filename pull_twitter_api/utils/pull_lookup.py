@@ -18,7 +18,7 @@ def pull_lookup(client: Client,
                 id_csv: str,
                 api_response: LookupResponse = None,
                 output_dir: str = None,
-                save_format: str = 'csv',
+                save_format: str = 'parquet',
                 full_save: bool = True,
                 auto_save: bool = False,
                 id_col: str = 'id',
@@ -50,3 +50,7 @@ def pull_lookup(client: Client,
     except Exception as e:
         print(f"Failed to pull tweets for ids. Error: ", e)
         return None
+    finally:
+        # output files are left open if the pull failed part way
+        if api_response is not None:
+            api_response.close()
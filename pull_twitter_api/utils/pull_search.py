@@ -18,13 +18,15 @@ def pull_search(client: Client,
                 query: str,
                 api_response: SearchResponse = None,
                 output_dir: str = None,
-                save_format: str = 'csv',
+                save_format: str = 'parquet',
                 full_save: bool = True,
                 auto_save: bool = False,
                 max_response: int = 100,
                 start_time: str = None,
                 end_time: str = None,
-                tweets_per_query: int = 100):
+                tweets_per_query: int = 100,
+                min_request_interval: float = 1.0,
+                validate: bool = True):
     search_query_params = query_params.copy().reformat('tweet')
 
     # set up the search
@@ -47,9 +49,15 @@ def pull_search(client: Client,
             save_format=save_format,
             full_save=full_save,
             auto_save=auto_save,
-            batch_size=tweets_per_query)
+            batch_size=tweets_per_query,
+            min_request_interval=min_request_interval,
+            validate=validate)
 
         return response
     except Exception as e:
         print(f"Failed to pull tweets for query. Error: ", e)
         return None
+    finally:
+        # output files are left open if the pull failed part way
+        if api_response is not None:
+            api_response.close()
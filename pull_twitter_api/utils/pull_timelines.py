@@ -3,10 +3,12 @@ This script handles the polling of reaction count data using the tweets api. API
 https://developer.twitter.com/en/docs/twitter-api/tweets/lookup/api-reference/get-tweets
 """
 import os
+from concurrent.futures import ThreadPoolExecutor
 from tweepy.client import Client
 import yaml
 import pprint
 from .twitter_schema import LookupQueryParams
+from .retry import call_with_retries
 from .timeline import Timeline
 from .pull_twitter_response import TimelineResponse
 import pandas as pd
@@ -25,7 +27,9 @@ def pull_timelines(client: Client,
                    skip_column: str = "skip",
                    output_user: bool = False,
                    use_skip: bool = False,
-                   tweets_per_query: int = 100):
+                   tweets_per_query: int = 100,
+                   max_workers: int = 8,
+                   validate: bool = True):
     tl_query_params = query_params.copy().reformat('tweet')
 
     # get search identifiers
@@ -43,16 +47,19 @@ def pull_timelines(client: Client,
     else:
         raise ValueError("`handle_column` and `author_id_column` are mutually exclusive arguments.")
 
+    # resolve handles to user ids up front, in batches rather than one request per handle
+    user_ids = lookup_user_ids(client, search_ident) if search_type == 'handle' else {}
+
     # set up the timeline
     timeline = Timeline(client, tl_query_params, search_type)
     response = TimelineResponse()
 
-    # Pull the tweets
-    for ix, ident in enumerate(search_ident):
+    def pull_timeline(ix, ident):
         print(f"Processing handle {ix + 1}/{len(search_ident)}")
         try:
-            response = timeline.pull(
+            return timeline.pull(
                 ident=ident,
+                user_id=user_ids.get(str(ident).lower()),
                 output_dir=output_dir,
                 api_response=api_response,
                 save_format=save_format,
@@ -60,7 +67,38 @@ def pull_timelines(client: Client,
                 auto_save=auto_save,
                 output_user=output_user,
                 ident_col=search_type,
-                tweets_per_query=tweets_per_query)
+                tweets_per_query=tweets_per_query,
+                validate=validate)
         except Exception as e:
             print(f"Failed to pull timeline for {search_type} {ident}. Error: ", e)
+            return None
+        finally:
+            # output files are left open if the pull failed part way
+            if api_response is not None:
+                api_response.close_user(ident)
+
+    # Pull the tweets, overlapping the api calls of several timelines
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for timeline_response in executor.map(pull_timeline, range(len(search_ident)), search_ident):
+            if timeline_response is not None:
+                response = timeline_response
     return response
+
+
+def lookup_user_ids(client: Client, handles: list, batch_size: int = 100) -> dict:
+    """
+    Map lowercased handles to user ids, looking up batch_size handles per request (at most 100 for the twitter api).
+    Handles missing from the result are left to be looked up individually by Timeline.pull
+    """
+    user_ids = {}
+    handles = [str(handle) for handle in handles]
+    for handle_batch in [handles[i:i + batch_size] for i in range(0, len(handles), batch_size)]:
+        try:
+            response = call_with_retries(lambda: client.get_users(usernames=handle_batch))
+        except Exception as e:
+            print(f"Failed to look up user ids for a batch of handles. Error: ", e)
+            continue
+
+        for user in response.data or []:
+            user_ids[user.username.lower()] = user.id
+    return user_ids
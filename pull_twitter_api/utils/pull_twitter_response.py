@@ -1,11 +1,15 @@
 import abc
+import itertools
 import json
 import yaml
-import csv
 import os
+import queue
+import threading
 import pandas as pd
 from datetime import datetime
 
+from .writers import CATEGORY_COLUMNS, open_writer
+
 """
 TODO:
 	- output_handle in all tweet dfs
@@ -15,13 +19,24 @@ TODO:
 """
 
 
+# Fields identifying a record of each data key, used to drop records the response has already seen
+RECORD_IDS = {
+    'links': ('parent_id', 'id', 'type'),
+    'refs': ('id',),
+    'users': ('id',),
+    'tweets': ('id',),
+    'media': ('media_key',),
+}
+
+
 class PullTwitterResponse(object):
     IDENT = 'base'
+    DATA_KEYS = ()
 
     def __init__(self,
                  auto_save=False,
                  create_dirs=True,
-                 save_format='csv',
+                 save_format='parquet',
                  output_dir=None,
                  retrieved_dt=None,
                  config=None,
@@ -35,6 +50,17 @@ class PullTwitterResponse(object):
         self.config = config
         self.command_dict = command_dict
 
+        # per-key list of record pages, only built into dataframes when accessed
+        self._records = {key: [] for key in self.DATA_KEYS}
+        self._seen = {key: set() for key in self.DATA_KEYS}
+        self._frames = {}
+        self._writers = {}
+        self._write_queue = None
+        self._write_thread = None
+        self._write_error = None
+        self._write_error_raised = False
+        self._unsaved = False
+
         self.has_saved = False
 
         if auto_save:
@@ -47,6 +73,79 @@ class PullTwitterResponse(object):
 		"""
         pass
 
+    @property
+    def df_links(self):
+        return self._get_df('links')
+
+    @property
+    def df_refs(self):
+        return self._get_df('refs')
+
+    @property
+    def df_users(self):
+        return self._get_df('users')
+
+    @property
+    def df_tweets(self):
+        return self._get_df('tweets')
+
+    @property
+    def df_media(self):
+        return self._get_df('media')
+
+    def _update_records(self, **new_data):
+        """
+		Buffer the records of a new page under their data key
+		"""
+
+        # only the most recent page is held when continually saving
+        if self.auto_save:
+            self._records = {key: [] for key in self.DATA_KEYS}
+
+        for key in self.DATA_KEYS:
+            records = self._new_records(key, new_data.get(key))
+            if records:
+                self._records[key].append(records)
+        self._frames = {}
+        self._unsaved = True
+
+    def _new_records(self, key, records):
+        """
+		Filter out records whose identifying fields were already seen by this response
+		"""
+
+        if not records:
+            return records
+
+        id_fields = RECORD_IDS[key]
+        seen = self._seen[key]
+        new_records = []
+        for record in records:
+            record_id = tuple(record.get(field) for field in id_fields)
+            if None not in record_id:
+                if record_id in seen:
+                    continue
+                seen.add(record_id)
+            new_records.append(record)
+        return new_records
+
+    def _get_records(self, key):
+        return list(itertools.chain.from_iterable(self._records.get(key, [])))
+
+    def _get_df(self, key):
+        """
+		Build (and cache) the dataframe for a data key with a single constructor call over all buffered pages.
+		Repetitive string columns are stored as categoricals
+		"""
+
+        if key not in self._frames:
+            df = pd.DataFrame(self._get_records(key)) if self._records.get(key) else None
+            if df is not None:
+                for col in df.columns.intersection(CATEGORY_COLUMNS):
+                    df[col] = df[col].astype('category')
+            self._frames[key] = df
+        return self._frames[key]
+
     def save(self, output_dir=None, **kwargs):
         """
 		Basic saves for all children response objects
@@ -95,41 +194,91 @@ class PullTwitterResponse(object):
         timestamp = datetime.now().strftime(dt_fmt)
         subcommand_dir = f"{self.output_dir}/{self.IDENT}"
         output_time_dir = f"{subcommand_dir}/{timestamp}"
-        if not os.path.isdir(subcommand_dir):
-            os.mkdir(subcommand_dir)
+        os.makedirs(subcommand_dir, exist_ok=True)
+
+        # responses created concurrently may share a timestamp, so later ones get a numbered directory
+        output_dir, suffix = output_time_dir, 1
+        while True:
+            try:
+                os.makedirs(output_dir)
+                break
+            except FileExistsError:
+                output_dir = f"{output_time_dir}_{suffix}"
+                suffix += 1
 
-        os.makedirs(output_time_dir)
+        self.output_dir = output_dir
 
-        self.output_dir = output_time_dir
+    def _save_data(self, output_dir, save_format):
+        """
+		Write the held records of every data key, continuing the files of earlier pages when continually saving
+		"""
 
-    # Static utility methods
+        # when continually saving, every page is written once as it arrives, so saving the response again (e.g.
+        # after the pull closed its files) has nothing to add and would truncate the files
+        if self.auto_save and not self._unsaved:
+            return
+        self._unsaved = False
 
-    @staticmethod
-    def _update_df(df: pd.DataFrame, new_data: list, append: bool = False) -> pd.DataFrame:
-        if new_data:
-            new_data_df = pd.DataFrame(new_data)
+        pages = {key: self._get_records(key) for key in self.DATA_KEYS}
 
-            if append:
-                return new_data_df
-            else:
-                new_df = pd.concat([df, new_data_df], axis=0) if df is not None else new_data_df
-                new_df = new_df.drop_duplicates()
+        if self.auto_save:
+            # pages are written on a background thread so that serialization overlaps the next api request
+            self._queue_write(output_dir, save_format, pages)
+        else:
+            self._write_pages(output_dir, save_format, pages)
+            self.close()
+
+    def _write_pages(self, output_dir, save_format, pages: dict) -> None:
+        for key, records in pages.items():
+            if records:
+                if key not in self._writers:
+                    self._writers[key] = open_writer(f"{output_dir}/data_{key}.{save_format}", save_format)
+                self._writers[key].write(records)
+
+    def _queue_write(self, output_dir, save_format, pages: dict) -> None:
+        if self._write_error is not None:
+            self._write_error_raised = True
+            raise self._write_error
+
+        if self._write_thread is None:
+            self._write_queue = queue.Queue(maxsize=4)
+            self._write_thread = threading.Thread(target=self._write_worker, daemon=True)
+            self._write_thread.start()
+        self._write_queue.put((output_dir, save_format, pages))
+
+    def _write_worker(self) -> None:
+        while True:
+            item = self._write_queue.get()
+            if item is None:
+                return
+
+            # keep draining the queue after a failure so that producers never block on it
+            if self._write_error is None:
+                try:
+                    self._write_pages(*item)
+                except Exception as e:
+                    self._write_error = e
+
+    def close(self) -> None:
+        """
+		Finish queued writes and close the output files of the response
+		"""
 
-                return new_df
-        return None
+        if self._write_thread is not None:
+            self._write_queue.put(None)
+            self._write_thread.join()
+            self._write_thread = None
 
-    @staticmethod
-    def _save_df(df: pd.DataFrame, output_dir, fn_suffix, save_format, append: bool = False) -> None:
-        save_path = f"{output_dir}/data_{fn_suffix}.{save_format}"
-
-        if df is not None:
-            if save_format == 'csv':
-                mode = 'a' if append else 'w'
-                with open(save_path, mode, encoding='utf-8') as f:
-                    df.to_csv(f, index=False, quoting=csv.QUOTE_ALL,
-                              header=not f.tell(), mode=mode)
-            elif save_format == 'json':
-                df.to_json(save_path, orient='table', mode='a' if append else 'w')
+        for writer in self._writers.values():
+            writer.close()
+        self._writers = {}
+
+        error, raised = self._write_error, self._write_error_raised
+        self._write_error, self._write_error_raised = None, False
+        if error is not None and not raised:
+            raise error
+
+    # Static utility methods
 
     @staticmethod
     def _create_result_subdir(subdir_name, output_dir=None):
@@ -140,16 +289,12 @@ class PullTwitterResponse(object):
 
 
 class SingleTimelineResponse(PullTwitterResponse):
+    DATA_KEYS = ('links', 'refs', 'users', 'tweets', 'media')
 
     def __init__(self, *args, **kwargs):
         super(SingleTimelineResponse, self).__init__(create_dirs=False, **kwargs)
 
         self.user = None
-        self.df_links = None
-        self.df_refs = None
-        self.df_users = None
-        self.df_tweets = None
-        self.df_media = None
 
         self.has_saved = False
 
@@ -159,23 +304,19 @@ class SingleTimelineResponse(PullTwitterResponse):
                     new_users=None,
                     new_tweets=None,
                     new_media=None):
-        self.df_links = PullTwitterResponse._update_df(self.df_links, new_links, append=self.auto_save)
-        self.df_refs = PullTwitterResponse._update_df(self.df_refs, new_refs, append=self.auto_save)
-        self.df_users = PullTwitterResponse._update_df(self.df_users, new_users, append=self.auto_save)
-        self.df_tweets = PullTwitterResponse._update_df(self.df_tweets, new_tweets, append=self.auto_save)
-        self.df_media = PullTwitterResponse._update_df(self.df_media, new_media, append=self.auto_save)
+        self._update_records(links=new_links,
+                             refs=new_refs,
+                             users=new_users,
+                             tweets=new_tweets,
+                             media=new_media)
 
         # if self.auto_save:
         #     self.save(user_out_dir=self.output_dir)
 
-    def save(self, user_out_dir=None, save_format='csv'):
+    def save(self, user_out_dir=None, save_format='parquet'):
         super(SingleTimelineResponse, self).save(output_dir=user_out_dir, save_format=save_format)
-        print('\n', self.output_dir, self.df_tweets.shape)
-        PullTwitterResponse._save_df(self.df_links, user_out_dir, 'links', save_format, append=self.auto_save)
-        PullTwitterResponse._save_df(self.df_refs, user_out_dir, 'refs', save_format, append=self.auto_save)
-        PullTwitterResponse._save_df(self.df_users, user_out_dir, 'users', save_format, append=self.auto_save)
-        PullTwitterResponse._save_df(self.df_tweets, user_out_dir, 'tweets', save_format, append=self.auto_save)
-        PullTwitterResponse._save_df(self.df_media, user_out_dir, 'media', save_format, append=self.auto_save)
+        print('\n', self.output_dir, len(self._get_records('tweets')))
+        self._save_data(user_out_dir, save_format)
 
         self.has_saved = True
 
@@ -191,6 +332,9 @@ class TimelineResponse(PullTwitterResponse):
 
         self.timelines = {}
 
+        # timelines may be pulled concurrently into a single response
+        self._lock = threading.Lock()
+
     def update_data(self,
                     user=None,
                     new_links=None,
@@ -199,10 +343,14 @@ class TimelineResponse(PullTwitterResponse):
                     new_tweets=None,
                     new_media=None):
 
-        if user not in self.timelines.keys():
-            self.timelines[user] = SingleTimelineResponse(auto_save=self.auto_save)
+        # the lock only guards the shared timelines dict and output directory, each user's timeline is only
+        # updated, saved and closed by the worker pulling it
+        with self._lock:
+            if user not in self.timelines.keys():
+                self.timelines[user] = SingleTimelineResponse(auto_save=self.auto_save)
+            response = self.timelines[user]
 
-        self.timelines[user].update_data(
+        response.update_data(
             new_links=new_links,
             new_refs=new_refs,
             new_users=new_users,
@@ -213,10 +361,23 @@ class TimelineResponse(PullTwitterResponse):
         if self.auto_save:
             self.save_user(user)
 
+    def close_user(self, user) -> None:
+        with self._lock:
+            response = self.timelines.get(user)
+        if response is not None:
+            response.close()
+
+    def close(self) -> None:
+        with self._lock:
+            responses = list(self.timelines.values())
+        for response in responses:
+            response.close()
+
     def save_user(self, user, output_dir=None):
-        super(TimelineResponse, self).save(output_dir=output_dir)
+        with self._lock:
+            super(TimelineResponse, self).save(output_dir=output_dir)
+            response = self.timelines[user]
 
-        response = self.timelines[user]
         if not response.has_saved:
             PullTwitterResponse._create_result_subdir(user, output_dir=self.output_dir)
         user_out_dir = f"{self.output_dir}/{user}"
@@ -229,44 +390,29 @@ class SearchResponse(PullTwitterResponse):
 	"""
 
     IDENT = 'search'
+    DATA_KEYS = ('links', 'refs', 'users', 'tweets', 'media')
 
     def __init__(self, *args, **kwargs):
         super(SearchResponse, self).__init__(**kwargs)
 
-        self.df_links = None
-        self.df_refs = None
-        self.df_users = None
-        self.df_tweets = None
-        self.df_media = None
-
     def update_data(self,
                     new_links=None,
                     new_refs=None,
                     new_users=None,
                     new_tweets=None,
                     new_media=None):
-        self.df_links = super(SearchResponse, self)._update_df(self.df_links, new_links, append=self.auto_save)
-        self.df_refs = super(SearchResponse, self)._update_df(self.df_refs, new_refs, append=self.auto_save)
-        self.df_users = super(SearchResponse, self)._update_df(self.df_users, new_users, append=self.auto_save)
-        self.df_tweets = super(SearchResponse, self)._update_df(self.df_tweets, new_tweets, append=self.auto_save)
-        self.df_media = super(SearchResponse, self)._update_df(self.df_media, new_media, append=self.auto_save)
+        self._update_records(links=new_links,
+                             refs=new_refs,
+                             users=new_users,
+                             tweets=new_tweets,
+                             media=new_media)
 
         if self.auto_save:
             self.save()
 
     def save(self, output_dir=None):
         super(SearchResponse, self).save(output_dir=output_dir)
-
-        super(SearchResponse, self)._save_df(self.df_links, self.output_dir, 'links', self.save_format,
-                                             append=self.auto_save)
-        super(SearchResponse, self)._save_df(self.df_refs, self.output_dir, 'refs', self.save_format,
-                                             append=self.auto_save)
-        super(SearchResponse, self)._save_df(self.df_users, self.output_dir, 'users', self.save_format,
-                                             append=self.auto_save)
-        super(SearchResponse, self)._save_df(self.df_tweets, self.output_dir, 'tweets', self.save_format,
-                                             append=self.auto_save)
-        super(SearchResponse, self)._save_df(self.df_media, self.output_dir, 'media', self.save_format,
-                                             append=self.auto_save)
+        self._save_data(self.output_dir, self.save_format)
 
 
 class LookupResponse(PullTwitterResponse):
@@ -275,44 +421,29 @@ class LookupResponse(PullTwitterResponse):
 	"""
 
     IDENT = 'lookup'
+    DATA_KEYS = ('links', 'refs', 'users', 'tweets', 'media')
 
     def __init__(self, *args, **kwargs):
         super(LookupResponse, self).__init__(**kwargs)
 
-        self.df_links = None
-        self.df_refs = None
-        self.df_users = None
-        self.df_tweets = None
-        self.df_media = None
-
     def update_data(self,
                     new_links=None,
                     new_refs=None,
                     new_users=None,
                     new_tweets=None,
                     new_media=None):
-        self.df_links = super(LookupResponse, self)._update_df(self.df_links, new_links, append=self.auto_save)
-        self.df_refs = super(LookupResponse, self)._update_df(self.df_refs, new_refs, append=self.auto_save)
-        self.df_users = super(LookupResponse, self)._update_df(self.df_users, new_users, append=self.auto_save)
-        self.df_tweets = super(LookupResponse, self)._update_df(self.df_tweets, new_tweets, append=self.auto_save)
-        self.df_media = super(LookupResponse, self)._update_df(self.df_media, new_media, append=self.auto_save)
+        self._update_records(links=new_links,
+                             refs=new_refs,
+                             users=new_users,
+                             tweets=new_tweets,
+                             media=new_media)
 
         if self.auto_save:
             self.save()
 
     def save(self, output_dir=None):
         super(LookupResponse, self).save(output_dir=output_dir)
-
-        super(LookupResponse, self)._save_df(self.df_links, self.output_dir, 'links', self.save_format,
-                                             append=self.auto_save)
-        super(LookupResponse, self)._save_df(self.df_refs, self.output_dir, 'refs', self.save_format,
-                                             append=self.auto_save)
-        super(LookupResponse, self)._save_df(self.df_users, self.output_dir, 'users', self.save_format,
-                                             append=self.auto_save)
-        super(LookupResponse, self)._save_df(self.df_tweets, self.output_dir, 'tweets', self.save_format,
-                                             append=self.auto_save)
-        super(LookupResponse, self)._save_df(self.df_media, self.output_dir, 'media', self.save_format,
-                                             append=self.auto_save)
+        self._save_data(self.output_dir, self.save_format)
 
 
 class UserResponse(PullTwitterResponse):
@@ -320,26 +451,19 @@ class UserResponse(PullTwitterResponse):
 	API Response from calling a user-based subcommand
 	"""
     IDENT = 'user'
+    DATA_KEYS = ('users', 'tweets')
 
     def __init__(self, *args, **kwargs):
         super(UserResponse, self).__init__(**kwargs)
 
-        self.df_users = None
-        self.df_tweets = None
-
     def update_data(self,
                     new_users=None,
                     new_tweets=None):
-        self.df_users = super(UserResponse, self)._update_df(self.df_users, new_users, append=self.auto_save)
-        self.df_tweets = super(UserResponse, self)._update_df(self.df_tweets, new_tweets, append=self.auto_save)
+        self._update_records(users=new_users, tweets=new_tweets)
 
         if self.auto_save:
             self.save()
 
     def save(self, output_dir=None):
         super(UserResponse, self).save(output_dir=output_dir)
-
-        super(UserResponse, self)._save_df(self.df_users, self.output_dir, 'users', self.save_format,
-                                           append=self.auto_save)
-        super(UserResponse, self)._save_df(self.df_tweets, self.output_dir, 'tweets', self.save_format,
-                                           append=self.auto_save)
+        self._save_data(self.output_dir, self.save_format)
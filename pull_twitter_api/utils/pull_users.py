@@ -18,7 +18,7 @@ def pull_users(client: Client,
                user_csv: str,
                api_response: UserResponse = None,
                output_dir: str = None,
-               save_format: str = 'csv',
+               save_format: str = 'parquet',
                full_save: bool = True,
                auto_save: bool = False,
                handle_column: str = None,
@@ -58,3 +58,7 @@ def pull_users(client: Client,
     except Exception as e:
         print(f"Failed to pull user data. Error: ", e)
         return None
+    finally:
+        # output files are left open if the pull failed part way
+        if api_response is not None:
+            api_response.close()
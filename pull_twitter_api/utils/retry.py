@@ -0,0 +1,50 @@
+"""
+Retrying of twitter api calls
+"""
+import random
+import time
+from typing import Callable
+
+import tweepy.errors
+
+from . import exceptions
+
+
+def call_with_retries(call: Callable, max_retries: int = 5, base_delay: float = 0.1):
+    """
+    Call a twitter api function, retrying server errors with exponential backoff and jitter (or the Retry-After
+    header if it asks for longer) and waiting out rate limits until they reset.
+
+    Args:
+        call: function making the api request
+        max_retries: number of attempts before giving up
+        base_delay: delay in seconds before the first retry, doubled on every further attempt
+
+    Raises:
+        exceptions.MaxRetries: if every attempt failed
+    """
+    for attempt in range(max_retries):
+        try:
+            return call()
+        except tweepy.errors.TooManyRequests as e:
+            print("Warning: rate limit reached")
+            reset = _header(e, 'x-rate-limit-reset')
+            delay = reset - time.time() + 1 if reset else base_delay * 2 ** attempt
+        except tweepy.errors.TwitterServerError as e:
+            print("Warning:", e)
+            delay = max(_header(e, 'Retry-After'), base_delay * 2 ** attempt) + random.uniform(0, base_delay)
+
+        if attempt + 1 < max_retries:
+            delay = max(0.0, delay)
+            print(f"Sleeping for {delay:.2f} seconds and retrying")
+            time.sleep(delay)
+
+    raise exceptions.MaxRetries(f"Twitter api call failed {max_retries} times.")
+
+
+def _header(error: tweepy.errors.HTTPException, name: str) -> float:
+    # numeric header of the failed response, 0 if missing or not a number (Retry-After may be a date)
+    try:
+        return float(error.response.headers.get(name, 0))
+    except (AttributeError, TypeError, ValueError):
+        return 0.0
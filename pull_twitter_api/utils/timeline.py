@@ -1,12 +1,11 @@
-import time
 from typing import Union, List, Dict
-import tweepy.errors
 from tweepy.client import Client
 from tweepy.tweet import Tweet
 
 import twitteralchemy as twalc
 
 from . import exceptions
+from .retry import call_with_retries
 from .twitter_schema import LookupQueryParams
 from .pull_twitter_response import TimelineResponse
 
@@ -26,16 +25,28 @@ class Timeline:
         self.query_params = query_params
         self.ident_type = ident_type
 
+        # reformat all params as list type for tweepy once, they do not change during a pull
+        self._base_params: dict = {key: (val if isinstance(val, list) else [val])
+                                   for key, val in query_params.dict(exclude_unset=True).items()}
+
+        # the reference table is only built if referenced tweets are requested
+        self._has_refs: bool = 'referenced_tweets' in query_params.tweet_field_names()
+
+        # unvalidated tweets get every requested field, the api leaves out the fields a tweet does not have
+        self._empty_tweet: dict = dict.fromkeys(('id', 'text') + query_params.tweet_field_names())
+
     def pull(self,
              ident: str,
              ident_col: str,
+             user_id: str = None,
              api_response: TimelineResponse = None,
              auto_save: bool = False,
              output_dir: str = None,
-             save_format: str = 'csv',
+             save_format: str = 'parquet',
              full_save=True,
              output_user: bool = False,
-             tweets_per_query: int = 100):
+             tweets_per_query: int = 100,
+             validate: bool = True):
         """
         Lookup the tweets to get updated reaction counts.
 
@@ -43,22 +54,25 @@ class Timeline:
             ident: the identifier for the user, an instance of either 'handle' or 'author_id'
             output_dir: location of output data
             ident_col: the name of the output column to save the identifier
+            user_id: the already resolved user id of a handle, skips looking it up
             full_save: whether to save extra tweet information (entities, geo, etc.) or not
             output_user: weather or not to output the user identifier with each tweet
             tweets_per_query: num_tweets the number of database entries processed. Mainly for debugging purposes.
+            validate: whether to parse tweets through twitteralchemy or save the api tweet payloads as they are
         """
 
         print(f"Pulling timeline for {self.ident_type} {ident}.")
 
         # attempt to get user_id
         if self.ident_type == 'handle':
-            try:
-                user_id = self.client.get_user(username=ident).data.id
-            except Exception as e:
-                print(f"Failed to get user id for {ident}")
-                raise e
-
-            print(f"Successfully retrieved user_id {user_id} for @{ident}.")
+            if user_id is None:
+                try:
+                    user_id = self.client.get_user(username=ident).data.id
+                except Exception as e:
+                    print(f"Failed to get user id for {ident}")
+                    raise e
+
+                print(f"Successfully retrieved user_id {user_id} for @{ident}.")
         elif self.ident_type == 'author_id':
             user_id = ident
         else:
@@ -73,6 +87,10 @@ class Timeline:
         finished = False
         next_token = None
         num_collected = 0
+        dict_func = lambda twitter_api_obj: twitter_api_obj.to_full_dict()
+        if not full_save:
+            dict_func = lambda twitter_api_obj: twitter_api_obj.to_dict()
+
         while not finished:
             # Get tweet data from twitter api
             try:
@@ -81,33 +99,30 @@ class Timeline:
                 print(f"No tweets in the response. Continuing. Exception message: {e}")
                 continue
             except exceptions.MaxRetries as e:
-                print(f"Max retries exceeded when calling the tweets api. Continuing but may lead to loss of "
-                      f"count data. Exception message: {e}")
-                continue
+                print(f"Max retries exceeded when calling the tweets api. Stopping the timeline of "
+                      f"{self.ident_type} {ident}. Exception message: {e}")
+                break
 
             # insert tweets into file
             tweets: List[dict] = response.data
 
-            # includes and expansions extraction
-            includes: List[dict] = twalc.Includes(**(response.includes))
-            ref_tweets, rel_users, inc_media = includes.tweets, includes.users, includes.media
-
-            # reference table
-            has_refs: bool = 'referenced_tweets' in self.query_params.tweet_fields
-
             if tweets:
-                dict_func = lambda twitter_api_obj: twitter_api_obj.to_full_dict()
-                if not full_save:
-                    dict_func = lambda twitter_api_obj: twitter_api_obj.to_dict()
+                # includes and expansions extraction, skipped when the response has none
+                includes = twalc.Includes(**response.includes) if response.includes else None
+                ref_tweets, rel_users, inc_media = (includes.tweets, includes.users, includes.media) if includes \
+                    else (None, None, None)
 
                 # Expansions parsing
                 ref_tweets = [dict_func(tw) for tw in ref_tweets] if ref_tweets else None
                 rel_users = [dict_func(us) for us in rel_users] if rel_users else None
                 media = [dict_func(md) for md in inc_media] if inc_media else None
-                links = Timeline.__parse_tweet_links(tweets) if has_refs else None
+                links = Timeline.__parse_tweet_links(tweets) if self._has_refs else None
 
                 # Original Tweets Parsing
-                tweets = [dict_func(twalc.Tweet(**tw)) for tw in tweets]
+                if validate:
+                    tweets = [dict_func(twalc.Tweet(**tw)) for tw in tweets]
+                else:
+                    tweets = [{**self._empty_tweet, **tw.data} for tw in tweets]
 
                 # Update response object
                 api_response.update_data(ident,
@@ -125,6 +140,9 @@ class Timeline:
             if next_token is None:
                 finished = True
                 print('\n' + '-' * 30)
+
+        # finish this user's output files
+        api_response.close_user(ident)
         return api_response
 
     def get_tweets(self, ids: Union[List[Union[int, str]], Union[int, str]],
@@ -132,42 +150,20 @@ class Timeline:
                    next_token: str = None,
                    tweets_per_query: int = 100):
 
-        params: dict = self.query_params.dict(exclude_unset=True)
-        # reformat all params as list type for tweepy
-        for key, val in params.items():
-            if not isinstance(val, list):
-                val = [val]
-            params[key] = val
+        params: dict = self._base_params.copy()
 
         if since_id:
             params['since_id'] = since_id
         params['pagination_token'] = next_token
         params['max_results'] = tweets_per_query
 
-        max_retries = 5
-        retries = 0
-        while retries < max_retries:
-            try:
-                return self.client.get_users_tweets(ids, **params)
-            except tweepy.errors.TwitterServerError as e:
-                print("Warning:", e)
-                print("Sleeping for 0.1 seconds and retrying")
-                retries += 1
-                time.sleep(0.1)
+        return call_with_retries(lambda: self.client.get_users_tweets(ids, **params))
 
     @staticmethod
     def __parse_tweet_links(tweets: List[Tweet]) -> List[dict]:
-        tweet_links = []
-        for tweet in tweets:
-            if tweet['referenced_tweets'] is not None:
-                for ref in tweet['referenced_tweets']:
-                    new_link = {
-                        'parent_id': tweet['id'],
-                        'id': ref['id'],
-                        'type': ref['type']
-                    }
-                    tweet_links.append(new_link)
-        return tweet_links
+        return [{'parent_id': tweet['id'], 'id': ref['id'], 'type': ref['type']}
+                for tweet in tweets if tweet['referenced_tweets'] is not None
+                for ref in tweet['referenced_tweets']]
 
     @staticmethod
     def _get_reaction_counts(tweet: Tweet) -> Dict:
@@ -4,13 +4,13 @@ import csv
 import time
 
 import pandas as pd
-import tweepy.errors
 from tweepy.client import Client
 from tweepy.tweet import Tweet
 
 import twitteralchemy as twalc
 
 from . import exceptions
+from .retry import call_with_retries
 from .twitter_schema import LookupQueryParams
 from .pull_twitter_response import PullTwitterResponse, LookupResponse
 
@@ -27,12 +27,19 @@ class TweetLookup:
 		self.client: Client = tweepy_client
 		self.query_params = query_params
 
+		# reformat all params as list type for tweepy once, they do not change during a pull
+		self._base_params: dict = {key: (val if isinstance(val, list) else [val])
+			for key, val in query_params.dict(exclude_unset=True).items()}
+
+		# the reference table is only built if referenced tweets are requested
+		self._has_refs: bool = 'referenced_tweets' in query_params.tweet_field_names()
+
 	def pull(self, 
 		ids: List[str], 
 		api_response: LookupResponse = None,
 		auto_save: bool = False, 
 		output_dir: str = None, 
-		save_format: str = 'csv', 
+		save_format: str = 'parquet', 
 		full_save = True,
 		batch_size: int = 100):
 		"""
@@ -41,7 +48,7 @@ class TweetLookup:
 		Args:
 			id_csv- Csv of tweet ids to fetch
 			output_dir: parent directory of all twitter_pull results
-			save_format: the file type of the output results (csv or json)
+			save_format: the file type of the output results (parquet, feather, csv or json)
 			full_save: whether to save extra tweet information (entities, geo, etc.) or not
 			auto_save: whether to continually save to disk after each batch
 		"""
@@ -59,6 +66,10 @@ class TweetLookup:
 				save_format = save_format, 
 				output_dir = output_dir)
 
+		dict_func = lambda twitter_api_obj: twitter_api_obj.to_full_dict()
+		if not full_save:
+			dict_func = lambda twitter_api_obj: twitter_api_obj.to_dict()
+
 		for batch in id_batches:
 			
 			# Get tweet data from twitter api
@@ -78,23 +89,17 @@ class TweetLookup:
 			# tweets extraction
 			tweets: List[dict] = response.data
 
-			# includes and expansions extraction
-			includes: List[dict] = twalc.Includes(**(response.includes))
-			ref_tweets, rel_users, inc_media = includes.tweets, includes.users, includes.media
-
-			# reference table
-			has_refs: bool = 'referenced_tweets' in self.query_params.tweet_fields
-
 			if tweets:
-				dict_func = lambda twitter_api_obj: twitter_api_obj.to_full_dict()
-				if not full_save:
-					dict_func = lambda twitter_api_obj: twitter_api_obj.to_dict()
+				# includes and expansions extraction, skipped when the response has none
+				includes = twalc.Includes(**response.includes) if response.includes else None
+				ref_tweets, rel_users, inc_media = (includes.tweets, includes.users, includes.media) if includes \
+					else (None, None, None)
 
 				# Expansions parsing
 				ref_tweets = [dict_func(tw) for tw in ref_tweets] if ref_tweets else None
 				rel_users = [dict_func(us) for us in rel_users] if rel_users else None
 				media = [dict_func(md) for md in inc_media] if inc_media else None
-				links = TweetLookup.__parse_tweet_links(tweets) if has_refs else None
+				links = TweetLookup.__parse_tweet_links(tweets) if self._has_refs else None
 
 				# Original Tweets Parsing
 				tweets = [dict_func(twalc.Tweet(**tw)) for tw in tweets]
@@ -115,37 +120,16 @@ class TweetLookup:
 			end_time_req = time.time()
 			time.sleep(max(0, 1.1 - (end_time_req-start_time_req)))
 
+		api_response.close()
 		return api_response
 
 	def lookup_tweets(self, ids: List[str]):
-		params: dict = self.query_params.dict(exclude_unset=True)
-		# reformat all params as list type for tweepy
-		for key, val in params.items():
-			if not isinstance(val, list):
-				val = [val]
-			params[key] = val
-
-		max_retries = 5
-		retries = 0
-		while retries < max_retries:
-			try:
-				return self.client.get_tweets(ids, **params)
-			except tweepy.errors.TwitterServerError as e:
-				print("Warning:", e)
-				print("Sleeping for 0.1 seconds and retrying")
-				retries += 1
-				time.sleep(0.1)
+		params: dict = self._base_params
+
+		return call_with_retries(lambda: self.client.get_tweets(ids, **params))
 
 	@staticmethod
 	def __parse_tweet_links(tweets: List[Tweet]) -> List[dict]:
-		tweet_links = []
-		for tweet in tweets:
-			if tweet['referenced_tweets'] is not None:
-				for ref in tweet['referenced_tweets']:
-					new_link = {
-						'parent_id': tweet['id'], 
-						'id': ref['id'],
-						'type': ref['type']
-					}
-					tweet_links.append(new_link)
-		return tweet_links
\ No newline at end of file
+		return [{'parent_id': tweet['id'], 'id': ref['id'], 'type': ref['type']}
+			for tweet in tweets if tweet['referenced_tweets'] is not None
+			for ref in tweet['referenced_tweets']]
\ No newline at end of file
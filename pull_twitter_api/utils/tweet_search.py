@@ -6,16 +6,33 @@ import csv
 import time
 
 import pandas as pd
-import tweepy.errors
 from tweepy.client import Client
 from tweepy.tweet import Tweet
 
 import twitteralchemy as twalc
 
 from . import exceptions
+from .retry import call_with_retries
 from .twitter_schema import LookupQueryParams
 from .pull_twitter_response import PullTwitterResponse, SearchResponse
 
+def _batches(total: int, batch_size: int, min_batch: int = 10):
+	"""
+	Yield the max_results of each search request needed to collect total tweets. The search api returns at
+	least min_batch tweets per request, so a short final batch borrows from the one before it.
+	"""
+	num_full, last_batch = divmod(total, batch_size)
+	if last_batch == 0:
+		yield from (batch_size for _ in range(num_full))
+	elif last_batch < min_batch and num_full > 0:
+		yield from (batch_size for _ in range(num_full - 1))
+		yield batch_size - (min_batch - last_batch)
+		yield min_batch
+	else:
+		yield from (batch_size for _ in range(num_full))
+		yield max(last_batch, min_batch)
+
+
 class TweetSearch:
 	"""
 	The TweetQuery class manages the connection to the twitter query API.
@@ -29,16 +46,28 @@ class TweetSearch:
 		self.client: Client = tweepy_client
 		self.query_params = query_params
 
+		# reformat all params as list type for tweepy once, they do not change during a pull
+		self._base_params: dict = {key: (val if isinstance(val, list) else [val])
+			for key, val in query_params.dict(exclude_unset=True).items()}
+
+		# the reference table is only built if referenced tweets are requested
+		self._has_refs: bool = 'referenced_tweets' in query_params.tweet_field_names()
+
+		# unvalidated tweets get every requested field, the api leaves out the fields a tweet does not have
+		self._empty_tweet: dict = dict.fromkeys(('id', 'text') + query_params.tweet_field_names())
+
 	def pull(self, query:str,
 		api_response: SearchResponse = None,
 		auto_save: bool = False,
 		output_dir: str = None,
-		save_format: str = 'csv',
+		save_format: str = 'parquet',
 		full_save = True,
 		start_time: Union[datetime, str] = None,
 		end_time: Union[datetime, str] = None,
 		max_results: int = 100,
-		batch_size: int = 100):
+		batch_size: int = 100,
+		min_request_interval: float = 1.0,
+		validate: bool = True):
 
 		"""
 		Query tweets based on query string
@@ -46,12 +75,17 @@ class TweetSearch:
 		Args:
 			query- Query string to use in searching tweets
 			output_dir: parent directory of all twitter_pull results
-			save_format: the file type of the output results (csv or json)
+			save_format: the file type of the output results (parquet, feather, csv or json)
 			full_save: whether to save extra tweet information (entities, geo, etc.) or not
 			auto_save: whether to continually save to disk after each batch
 			start_time: tweets will be searched beginning at this time
 			end_time: tweets will be searched at or before this time
 			max_results: total number of tweets to return for query
+			min_request_interval: minimum number of seconds between the start of consecutive requests. The full
+				archive search allows 1 request/sec; use 0.0 for endpoints without that limit. Requests are not
+				paced by the rate limit headers: once the window is used up, the client (wait_on_rate_limit) sleeps
+				until it resets after receiving a 429 response
+			validate: whether to parse tweets through twitteralchemy or save the api tweet payloads as they are
 		"""
 
 		print(f"Pulling tweet results using '{query}' search query.")
@@ -60,17 +94,6 @@ class TweetSearch:
 		save_path = f"{output_dir}/data_%s.{save_format}"
 		print(f"Saving tweets to {save_path}")
 
-		num_batches = (max_results//batch_size) + 1
-		batches = [batch_size] * num_batches
-		last_batch_size = max_results % batch_size
-		if last_batch_size < 10:
-			batches[-1] = 10
-			if num_batches > 1:
-				batches[-2] = batch_size - (10 - last_batch_size)
-		else:
-			batches[-1] = last_batch_size
-		
-
 		next_token = None
 		num_collected = 0
 
@@ -80,8 +103,15 @@ class TweetSearch:
 				save_format = save_format,
 				output_dir = output_dir)
 
-		for batch in batches:
-			
+		dict_func = lambda twitter_api_obj: twitter_api_obj.to_full_dict()
+		if not full_save:
+			dict_func = lambda twitter_api_obj: twitter_api_obj.to_dict()
+
+		for batch in _batches(max_results, batch_size):
+
+			# Start time of request (avoiding api rate limits)
+			start_time_req = time.time()
+
 			# Get tweet data from twitter api
 			try:
 				response = self.search_tweets(query, start_time = start_time, end_time = end_time, max_results = batch, next_token=next_token)
@@ -93,32 +123,26 @@ class TweetSearch:
 							f"count data. Exception message: {e}")
 				continue
 
-			# Start time of request (avoiding api rate limits)
-			start_time_req = time.time()
-
 			# tweets extraction
 			tweets: List[dict] = response.data
 
-			# includes and expansions extraction
-			includes: List[dict] = twalc.Includes(**(response.includes))
-			ref_tweets, rel_users, inc_media = includes.tweets, includes.users, includes.media
-
-			# reference table
-			has_refs: bool = 'referenced_tweets' in self.query_params.tweet_fields
-
 			if tweets:
-				dict_func = lambda twitter_api_obj: twitter_api_obj.to_full_dict()
-				if not full_save:
-					dict_func = lambda twitter_api_obj: twitter_api_obj.to_dict()
+				# includes and expansions extraction, skipped when the response has none
+				includes = twalc.Includes(**response.includes) if response.includes else None
+				ref_tweets, rel_users, inc_media = (includes.tweets, includes.users, includes.media) if includes \
+					else (None, None, None)
 
 				# Expansions parsing
 				ref_tweets = [dict_func(tw) for tw in ref_tweets] if ref_tweets else None
 				rel_users = [dict_func(us) for us in rel_users] if rel_users else None
 				media = [dict_func(md) for md in inc_media] if inc_media else None
-				links = TweetSearch.__parse_tweet_links(tweets) if has_refs else None
+				links = TweetSearch.__parse_tweet_links(tweets) if self._has_refs else None
 
 				# Original Tweets Parsing
-				tweets = [dict_func(twalc.Tweet(**tw)) for tw in tweets]
+				if validate:
+					tweets = [dict_func(twalc.Tweet(**tw)) for tw in tweets]
+				else:
+					tweets = [{**self._empty_tweet, **tw.data} for tw in tweets]
 
 				# Update response object
 				api_response.update_data(new_links = links,
@@ -137,10 +161,11 @@ class TweetSearch:
 				print('\n' + '-'*30)
 				break
 
-			# Request end time to avoiding 1 request/sec rate limit
+			# Only wait out what remains of the request interval, the request itself counts towards it
 			end_time_req = time.time()
-			time.sleep(max(0, 1.0 - (end_time_req-start_time_req)))
+			time.sleep(max(0, min_request_interval - (end_time_req-start_time_req)))
 
+		api_response.close()
 		return api_response
 
 	def search_tweets(self, query: str, 
@@ -149,12 +174,7 @@ class TweetSearch:
 					max_results: int = 10,
 					next_token: str = None):
 
-		params: dict = self.query_params.dict(exclude_unset=True)
-		# reformat all params as list type for tweepy
-		for key, val in params.items():
-			if not isinstance(val, list):
-				val = [val]
-			params[key] = val
+		params: dict = self._base_params.copy()
 
 		if start_time:
 			params['start_time'] = start_time
@@ -164,27 +184,10 @@ class TweetSearch:
 		params['next_token'] = next_token
 		params['max_results'] = max_results
 
-		max_retries = 5
-		retries = 0
-		while retries < max_retries:
-			try:
-				return self.client.search_all_tweets(query, **params)
-			except tweepy.errors.TwitterServerError as e:
-				print("Warning:", e)
-				print("Sleeping for 0.1 seconds and retrying")
-				retries += 1
-				time.sleep(0.1)
+		return call_with_retries(lambda: self.client.search_all_tweets(query, **params))
 
 	@staticmethod
 	def __parse_tweet_links(tweets: List[Tweet]) -> List[dict]:
-		tweet_links = []
-		for tweet in tweets:
-			if tweet['referenced_tweets'] is not None:
-				for ref in tweet['referenced_tweets']:
-					new_link = {
-						'parent_id': tweet['id'], 
-						'id': ref['id'],
-						'type': ref['type']
-					}
-					tweet_links.append(new_link)
-		return tweet_links
\ No newline at end of file
+		return [{'parent_id': tweet['id'], 'id': ref['id'], 'type': ref['type']}
+			for tweet in tweets if tweet['referenced_tweets'] is not None
+			for ref in tweet['referenced_tweets']]
\ No newline at end of file
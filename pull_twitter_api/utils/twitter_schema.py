@@ -127,6 +127,14 @@ class LookupQueryParams(BaseModel):
 
         return self
 
+    def tweet_field_names(self) -> tuple:
+        '''
+        Names of the requested tweet fields
+        '''
+
+        tweet_fields = self.tweet_fields or []
+        return tuple(tweet_fields if isinstance(tweet_fields, list) else [tweet_fields])
+
     class Config:
         extra = "forbid"
         use_enum_values = True
\ No newline at end of file
@@ -1,11 +1,9 @@
 import os.path
-import time
 from datetime import datetime
 from typing import Union, List, Dict
 import csv
 
 import pandas as pd
-import tweepy.errors
 from tweepy.client import Client
 from tweepy.tweet import Tweet
 
@@ -14,6 +12,7 @@ import twitteralchemy as twalc
 # from utils import exceptions
 # from utils.twitter_schema import LookupQueryParams
 from . import exceptions
+from .retry import call_with_retries
 from .twitter_schema import LookupQueryParams
 from .pull_twitter_response import PullTwitterResponse, UserResponse
 
@@ -32,12 +31,16 @@ class User:
         self.query_params = query_params
         self.ident_type = ident_type
 
+        # reformat all params as list type for tweepy once, they do not change during a pull
+        self._base_params: dict = {key: (val if isinstance(val, list) else [val])
+                                   for key, val in query_params.dict(exclude_unset=True).items()}
+
     def pull(self, 
         ident: Union[List[str], str],
         api_response: UserResponse = None,
         auto_save: bool = False,
         output_dir: str = None, 
-        save_format: str = 'csv', 
+        save_format: str = 'parquet', 
         full_save = True,
         batch_size: int = 100):
         """
@@ -45,7 +48,7 @@ class User:
         Args:
             ident: the identifier for the user, an instance of either 'handle' or 'author_id'
             output_dir: the directory to save the data
-            save_format: file type to save results as (currently "csv" and "json" are supported)
+            save_format: file type to save results as ("parquet", "feather", "csv" and "json" are supported)
             full_save: whether to save extra tweet information (entities, geo, etc.) or not
             batch_size: number of handles to include in each request.  Maximum for twitter api is 100
         """
@@ -61,6 +64,10 @@ class User:
                 save_format = save_format,
                 output_dir = output_dir)
 
+        dict_func = lambda twitter_api_obj: twitter_api_obj.to_full_dict()
+        if not full_save:
+            dict_func = lambda twitter_api_obj: twitter_api_obj.to_dict()
+
         for ident_batch in ident_batches:
             try:
                 response = self.get_users_data(ident_batch)
@@ -75,14 +82,9 @@ class User:
             # users extraction
             users: List[dict] = response.data
 
-            # includes and expansions extraction
-            includes: List[dict] = twalc.Includes(**(response.includes))
-            ref_tweets = includes.tweets
-
             if users:
-                dict_func = lambda twitter_api_obj: twitter_api_obj.to_full_dict()
-                if not full_save:
-                    dict_func = lambda twitter_api_obj: twitter_api_obj.to_dict()
+                # includes and expansions extraction, skipped when the response has none
+                ref_tweets = twalc.Includes(**response.includes).tweets if response.includes else None
 
                 users = [dict_func(twalc.User(**user_dict)) for user_dict in users]
                 tweets = [dict_func(tw) for tw in ref_tweets] if ref_tweets else None
@@ -91,29 +93,17 @@ class User:
 
                 num_collected += len(users)
                 print(f"\rCollected {num_collected} users", end='')
+
+        api_response.close()
         return api_response
 
     def get_users_data(self, ident: Union[List[str], str]):
 
-        params: dict = self.query_params.dict(exclude_unset=True)
-        # reformat all params as list type for tweepy
-        for key, val in params.items():
-            if not isinstance(val, list):
-                val = [val]
-            params[key] = val
+        params: dict = self._base_params
 
-        max_retries = 5
-        retries = 0
-        while retries < max_retries:
-            try:
-                if self.ident_type == 'handle':
-                    return self.client.get_users(usernames=ident, **params)
-                elif self.ident_type == 'author_id':
-                    return self.client.get_users(ids=ident, **params)
-                else:
-                    raise ValueError(f'type must be one of "handle" or "author_id". Received {self.ident_type}.')
-            except tweepy.errors.TwitterServerError as e:
-                print("Warning:", e)
-                print("Sleeping for 0.1 seconds and retrying")
-                retries += 1
-                time.sleep(0.1)
+        if self.ident_type == 'handle':
+            return call_with_retries(lambda: self.client.get_users(usernames=ident, **params))
+        elif self.ident_type == 'author_id':
+            return call_with_retries(lambda: self.client.get_users(ids=ident, **params))
+        else:
+            raise ValueError(f'type must be one of "handle" or "author_id". Received {self.ident_type}.')
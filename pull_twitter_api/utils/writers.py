@@ -0,0 +1,280 @@
+"""
+Writers that stream pages of response records into a single output file per data key
+"""
+import abc
+import csv
+import itertools
+import os
+
+import orjson
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+SAVE_FORMATS = ('parquet', 'feather', 'csv', 'json')
+
+# Low cardinality string columns, stored dictionary encoded (as pandas categoricals in memory)
+CATEGORY_COLUMNS = ('author_id', 'lang', 'source', 'in_reply_to_user_id')
+
+# Column types set explicitly for arrow outputs instead of inferred from each page, so they do not depend on which
+# values the first page holds (e.g. media without videos have no duration_ms). Ids are kept as strings
+ARROW_TYPES = {
+    'id': pa.string(),
+    'parent_id': pa.string(),
+    'conversation_id': pa.string(),
+    'pinned_tweet_id': pa.string(),
+    'media_key': pa.string(),
+    'created_at': pa.timestamp('ns', tz='UTC'),
+    'possibly_sensitive': pa.bool_(),
+    'protected': pa.bool_(),
+    'verified': pa.bool_(),
+    'duration_ms': pa.int64(),
+    'height': pa.int64(),
+    'width': pa.int64(),
+    **{col: pa.dictionary(pa.int32(), pa.string()) for col in CATEGORY_COLUMNS},
+}
+
+
+class RecordWriter(object):
+    """
+    Base class for writers appending pages of records to one file. Files cannot change their columns once
+    written, so when a page brings new columns (or, for arrow files, needs another column type) the records
+    written so far are copied into a new file with the changed columns, which replaces the output file on close
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file_path = path
+        self._rewrites = 0
+
+    @abc.abstractmethod
+    def write(self, records: list) -> None:
+        """
+        Write a page of records
+        """
+        pass
+
+    @abc.abstractmethod
+    def close(self) -> None:
+        """
+        Flush and close the output file
+        """
+        pass
+
+    def _rewrite_path(self, columns) -> str:
+        print(f"Columns {list(columns)} of {self.path} changed. Rewriting the records written so far.")
+        self._rewrites += 1
+        return f"{self.path}.{self._rewrites}.tmp"
+
+    def _replace(self, path: str) -> None:
+        # the previous file is only removed if it is itself a rewrite, the output path is replaced on close
+        if self._file_path != self.path:
+            os.remove(self._file_path)
+        self._file_path = path
+
+    def _finish(self) -> None:
+        if self._file_path != self.path:
+            os.replace(self._file_path, self.path)
+            self._file_path = self.path
+
+
+class CsvRecordWriter(RecordWriter):
+
+    def __init__(self, path: str):
+        super(CsvRecordWriter, self).__init__(path)
+        self._file = None
+        self._writer = None
+
+    def write(self, records: list) -> None:
+        fieldnames = list(dict.fromkeys(itertools.chain.from_iterable(records)))
+        if self._writer is None:
+            self._open(self.path, fieldnames)
+        elif not set(fieldnames).issubset(self._writer.fieldnames):
+            self._widen(fieldnames)
+        self._writer.writerows(records)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._finish()
+
+    def _open(self, path: str, fieldnames: list) -> None:
+        self._file = open(path, 'w', encoding='utf-8', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=fieldnames, extrasaction='raise',
+                                      quoting=csv.QUOTE_MINIMAL)
+        self._writer.writeheader()
+
+    def _widen(self, fieldnames: list) -> None:
+        new_columns = [name for name in fieldnames if name not in self._writer.fieldnames]
+        path = self._rewrite_path(new_columns)
+        self._file.close()
+        with open(self._file_path, 'r', encoding='utf-8', newline='') as f:
+            self._open(path, self._writer.fieldnames + new_columns)
+            self._writer.writerows(csv.DictReader(f))
+        self._replace(path)
+
+
+class JsonRecordWriter(RecordWriter):
+    """
+    Writes one json object per line
+    """
+
+    OPTION = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE
+
+    def __init__(self, path: str):
+        super(JsonRecordWriter, self).__init__(path)
+        self._file = open(path, 'wb')
+
+    def write(self, records: list) -> None:
+        self._file.writelines(orjson.dumps(record, default=str, option=self.OPTION) for record in records)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ArrowRecordWriter(RecordWriter):
+    """
+    Base class for writers of arrow tables. Column types follow to_arrow: empty columns take the type of the first
+    values they get, and columns with values that do not fit their type become strings
+    """
+
+    DICTIONARIES = True
+
+    def __init__(self, path: str):
+        super(ArrowRecordWriter, self).__init__(path)
+        self._writer = None
+        self._schema = None
+
+    def write(self, records: list) -> None:
+        table = to_arrow(records, schema=self._schema, dictionaries=self.DICTIONARIES)
+        if self._writer is None:
+            self._writer = self._open(self.path, table.schema)
+        elif table.schema != self._schema:
+            self._rewrite(table.schema)
+        self._schema = table.schema
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._finish()
+
+    @abc.abstractmethod
+    def _open(self, path: str, schema: pa.Schema):
+        pass
+
+    @abc.abstractmethod
+    def _read(self, path: str) -> pa.Table:
+        pass
+
+    def _rewrite(self, schema: pa.Schema) -> None:
+        path = self._rewrite_path(field.name for field in schema if field not in self._schema)
+        self._writer.close()
+        written = self._read(self._file_path)
+        columns = [_cast(written.column(field.name), field.type) if field.name in self._schema.names
+                   else pa.nulls(written.num_rows, field.type) for field in schema]
+        self._writer = self._open(path, schema)
+        self._writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+        self._replace(path)
+
+
+class ParquetRecordWriter(ArrowRecordWriter):
+    """
+    Writes each page as a zstd compressed row group
+    """
+
+    def _open(self, path: str, schema: pa.Schema):
+        return pq.ParquetWriter(path, schema, compression='zstd')
+
+    def _read(self, path: str) -> pa.Table:
+        return pq.read_table(path)
+
+
+class FeatherRecordWriter(ArrowRecordWriter):
+    """
+    Writes each page as lz4 compressed record batches of a feather (arrow ipc) file. The ipc file format does not
+    allow dictionaries to change between batches, so category columns are written as plain strings
+    """
+
+    DICTIONARIES = False
+
+    def _open(self, path: str, schema: pa.Schema):
+        return pa.ipc.new_file(path, schema, options=pa.ipc.IpcWriteOptions(compression='lz4'))
+
+    def _read(self, path: str) -> pa.Table:
+        with pa.OSFile(path, 'rb') as f:
+            return pa.ipc.open_file(f).read_all()
+
+
+_WRITERS = {
+    'parquet': ParquetRecordWriter,
+    'feather': FeatherRecordWriter,
+    'csv': CsvRecordWriter,
+    'json': JsonRecordWriter,
+}
+
+
+def open_writer(path: str, save_format: str) -> RecordWriter:
+    if save_format not in _WRITERS:
+        raise ValueError(f"save_format must be one of {SAVE_FORMATS}. Received {save_format}")
+    return _WRITERS[save_format](path)
+
+
+def to_arrow(records: list, schema: pa.Schema = None, dictionaries: bool = True) -> pa.Table:
+    """
+    Build an arrow table from a page of records. Columns are typed by ARROW_TYPES or inferred from the page, and
+    nested values are stored as json strings so that pages with other nested fields still fit the column. With
+    the schema of the pages already written to a file, its columns keep their type where the page fits it:
+    columns empty so far take the type of the page, and columns whose values do not fit their type become
+    strings. With dictionaries=False, CATEGORY_COLUMNS are kept as plain strings.
+    """
+
+    # columns are the union of the keys of all records of the page, not only those of the first record
+    names = dict.fromkeys(itertools.chain.from_iterable(records))
+    table = pa.Table.from_pydict({name: [record.get(name) for record in records] for name in names})
+
+    types = {field.name: field.type for field in schema} if schema is not None else {}
+    for name in table.column_names:
+        types.setdefault(name, pa.null())
+
+    columns = []
+    for name, arrow_type in types.items():
+        ix = table.schema.get_field_index(name)
+        if ix == -1:
+            columns.append(pa.nulls(table.num_rows, arrow_type))
+            continue
+
+        column = table.column(ix)
+        if pa.types.is_null(arrow_type):
+            arrow_type = _arrow_type(name, column.type, dictionaries)
+        try:
+            column = _cast(column, arrow_type)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            column = _cast(column, pa.string())
+        columns.append(column)
+
+    return pa.Table.from_arrays(columns, schema=pa.schema(
+        [pa.field(name, column.type) for name, column in zip(types, columns)]))
+
+
+def _arrow_type(name: str, inferred: pa.DataType, dictionaries: bool) -> pa.DataType:
+    arrow_type = ARROW_TYPES.get(name)
+    if arrow_type is None:
+        arrow_type = pa.string() if pa.types.is_nested(inferred) else inferred
+    if not dictionaries and pa.types.is_dictionary(arrow_type):
+        arrow_type = arrow_type.value_type
+    return arrow_type
+
+
+def _cast(column, arrow_type: pa.DataType):
+    if column.type == arrow_type:
+        return column
+    if pa.types.is_dictionary(arrow_type):
+        return _cast(column, arrow_type.value_type).dictionary_encode()
+    try:
+        return column.cast(arrow_type)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        if not pa.types.is_string(arrow_type):
+            raise
+        # nested values cannot be cast to strings by arrow, so they are stored as json
+        return pa.array([None if val is None else orjson.dumps(val, default=str).decode()
+                         for val in column.to_pylist()], type=arrow_type)